@@ -1,3 +1,7 @@
+import atexit
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
@@ -6,6 +10,19 @@ from flask_cors import CORS
 
 from extensions import db, migrate, jwt, cors
 
+def configure_logging(app):
+    # Hand log records to a background listener so request threads never
+    # block on stream/file writes. app.logger is shared by every app with the
+    # same name, so only move its handlers once, and only if it has any.
+    handlers = app.logger.handlers
+    if not handlers or any(isinstance(handler, QueueHandler) for handler in handlers):
+        return
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    app.logger.handlers = [QueueHandler(log_queue)]
+    listener.start()
+    atexit.register(listener.stop)
+
 def create_app():
     app = Flask(__name__)
 
@@ -20,6 +37,8 @@ def create_app():
         JWT_ERROR_MESSAGE_KEY='msg'
     )
     
+    configure_logging(app)
+    
     # Initialize extensions
     db.init_app(app)
     migrate.init_app(app, db)
@@ -61,13 +80,7 @@ def create_app():
         print("Using original users routes")
     from routes.products import products_bp
     
-    # Try to import the fixed cart routes first
-    try:
-        from routes.cart_fix import cart_bp
-        print("Using fixed cart routes")
-    except ImportError:
-        from routes.cart import cart_bp
-        print("Using original cart routes")
+    from routes.cart import cart_bp
     
     # Try to import the fixed orders routes first    
     try:
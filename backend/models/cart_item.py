@@ -3,6 +3,9 @@ from datetime import datetime
 
 class CartItem(db.Model):
     __tablename__ = 'cart_items'
+    __table_args__ = (
+        db.Index('ix_cartitem_user_product', 'user_id', 'product_id', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -15,11 +18,11 @@ class CartItem(db.Model):
     user = db.relationship('User', back_populates='cart_items')
     product = db.relationship('Product', back_populates='cart_items')
     
-    def to_dict(self):
+    def to_dict(self, include_seller=True):
         product_data = None
         try:
             if self.product:
-                product_data = self.product.to_dict()
+                product_data = self.product.to_dict(include_seller=include_seller)
         except Exception as e:
             product_data = {
                 "id": self.product_id,
@@ -25,8 +25,8 @@ class Product(db.Model):
     order_items = db.relationship('OrderItem', back_populates='product')
     cart_items = db.relationship('CartItem', back_populates='product')
     
-    def to_dict(self):
-        return {
+    def to_dict(self, include_seller=True):
+        data = {
             'id': self.id,
             'title': self.title,
             'description': self.description,
@@ -37,9 +37,11 @@ class Product(db.Model):
             'is_sold': self.is_sold,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'seller_id': self.seller_id,
-            'seller': self.seller.to_dict() if self.seller else None
+            'seller_id': self.seller_id
         }
+        if include_seller:
+            data['seller'] = self.seller.to_dict() if self.seller else None
+        return data
         
     def __repr__(self):
         return f'<Product {self.id}: {self.title}>'
\ No newline at end of file
@@ -1,6 +1,7 @@
 from extensions import db
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+from sqlalchemy import update, select
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -12,6 +13,8 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_login = db.Column(db.DateTime)
     avatar_url = db.Column(db.String(255), nullable=True)
+    # Incremented whenever the user's cart contents may have changed
+    cart_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     # Foreign keys
     role_id = db.Column(db.Integer, db.ForeignKey('roles.id'))
@@ -35,6 +38,28 @@ class User(db.Model):
             return False
         return check_password_hash(self.password_hash, password)
     
+    @classmethod
+    def bump_cart_version(cls, *user_ids):
+        db.session.execute(
+            update(cls)
+            .where(cls.id.in_(user_ids))
+            .values(cart_version=cls.cart_version + 1),
+            execution_options={"synchronize_session": False}
+        )
+    
+    @classmethod
+    def bump_cart_versions_for_products(cls, product_ids):
+        # Invalidate the carts of everyone holding one of these products
+        from models.cart_item import CartItem
+        db.session.execute(
+            update(cls)
+            .where(cls.id.in_(
+                select(CartItem.user_id).where(CartItem.product_id.in_(product_ids))
+            ))
+            .values(cart_version=cls.cart_version + 1),
+            execution_options={"synchronize_session": False}
+        )
+    
     def to_dict(self):
         return {
             'id': self.id,
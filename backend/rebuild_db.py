@@ -24,7 +24,8 @@ if confirmation.lower() != 'y':
 print("\nRebuilding database...")
 
 # Delete the database file if it exists
-db_file = Path("ecofinds.db")
+# Flask-SQLAlchemy resolves relative sqlite paths against the instance folder
+db_file = Path("instance") / "ecofinds.db"
 if db_file.exists():
     print(f"Deleting existing database file: {db_file}")
     try:
@@ -1,4 +1,4 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
 from models.user import User
 from models.product import Product
@@ -6,223 +6,410 @@ from models.cart_item import CartItem
 from models.order import Order
 from models.order_item import OrderItem
 from extensions import db
+from utils.fastjson import dumps, fast_response, raw_response
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import update, delete, insert, select, exists, literal, and_, func, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased, joinedload
 from werkzeug.exceptions import BadRequest, NotFound, Unauthorized, UnprocessableEntity
 
 cart_bp = Blueprint('cart', __name__)
 
+class AddToCartIn(BaseModel):
+    product_id: int
+
+class CheckoutIn(BaseModel):
+    shipping_address: Optional[str] = ''
+
+def _cart_items_with_products(user_id):
+    # Eager-load products in one query so listing unavailable items does not
+    # issue a SELECT per item; the seller is never serialized on this path
+    return CartItem.query.options(
+        joinedload(CartItem.product)
+    ).filter_by(user_id=user_id).all()
+
+def _is_duplicate_cart_item(error):
+    # psycopg2 reports the violated constraint directly; other drivers name
+    # the index (MySQL) or its columns (SQLite) in the message
+    diag = getattr(error.orig, 'diag', None)
+    if getattr(diag, 'constraint_name', None):
+        return diag.constraint_name == 'ix_cartitem_user_product'
+    message = str(error.orig)
+    return 'ix_cartitem_user_product' in message or (
+        'UNIQUE' in message and 'cart_items.user_id' in message and 'cart_items.product_id' in message
+    )
+
+def _lock_cart(user_id):
+    # Serialize checkout and item removal for one user, so a double-submitted
+    # checkout or a concurrent removal waits for the running checkout instead
+    # of racing it; advisory locks only exist on Postgres
+    if db.session.get_bind().dialect.name == 'postgresql':
+        db.session.execute(
+            text("SELECT pg_advisory_xact_lock(hashtext(:key))"),
+            {"key": f"checkout:{user_id}"}
+        )
+
+def _locked_checkout_rows(user_id):
+    # Lock the cart rows and their products so no other checkout can sell
+    # them before this transaction commits. Locks are taken in product id
+    # order so checkouts with overlapping carts can't deadlock. Row locking can't be applied to the nullable side
+    # of an outer join, so the cart size is selected alongside to tell when
+    # some items point at a deleted product
+    other_item = aliased(CartItem)
+    cart_count = select(func.count(other_item.id)).where(
+        other_item.user_id == user_id
+    ).scalar_subquery()
+    return db.session.query(
+        CartItem.id,
+        CartItem.product_id,
+        Product.price,
+        Product.is_sold,
+        cart_count.label('cart_count')
+    ).join(Product, CartItem.product_id == Product.id).filter(
+        CartItem.user_id == user_id
+    ).order_by(Product.id).with_for_update(of=(CartItem, Product)).all()
+
+def _cart_rows(user_id):
+    # Select only the columns the cart listing renders; the outer join keeps
+    # cart items whose product has been deleted so they can be reported.
+    # _render_cart unpacks rows positionally, so keep the column order in sync
+    return db.session.query(
+        CartItem.id,
+        CartItem.user_id,
+        CartItem.product_id.label('cart_product_id'),
+        CartItem.created_at,
+        Product.id.label('product_id'),
+        Product.title,
+        Product.price,
+        Product.condition,
+        Product.category,
+        Product.image_url,
+        Product.is_sold,
+        Product.seller_id
+    ).outerjoin(Product, CartItem.product_id == Product.id).filter(
+        CartItem.user_id == user_id
+    ).all()
+
+def _cart_summary(user_id):
+    # Total and count of the purchasable items, computed in the database
+    total, count = db.session.query(
+        func.coalesce(func.sum(Product.price), 0),
+        func.count(Product.id)
+    ).select_from(CartItem).join(Product, CartItem.product_id == Product.id).filter(
+        CartItem.user_id == user_id,
+        Product.is_sold.isnot(True)
+    ).one()
+    return {"total": total, "count": count}
+
+def _cart_item_row_to_dict(item_id, user_id, product_id, created_at, title, price,
+                           condition, category, image_url, is_sold, seller_id):
+    # A reduced CartItem.to_dict(include_seller=False): the product only has
+    # the fields the cart page renders (no description, created_at or
+    # updated_at), built from plain row values
+    return {
+        "id": item_id,
+        "user_id": user_id,
+        "product_id": product_id,
+        # orjson renders datetimes natively, matching isoformat()
+        "created_at": created_at,
+        "product": {
+            "id": product_id,
+            "title": title,
+            "price": price,
+            "condition": condition,
+            "category": category,
+            "image_url": image_url,
+            "is_sold": is_sold,
+            "seller_id": seller_id
+        }
+    }
+
+@lru_cache(maxsize=10000)
+def _render_cart(user_id, cart_version):
+    # cart_version is only part of the cache key: any write to the cart bumps
+    # it, so a cached body is never served for a cart that has changed
+    rows = _cart_rows(user_id)
+    
+    # Safely calculate total and check for missing/sold products. Valid items
+    # are serialized as they are read so no list of item dicts is kept around
+    item_parts = []
+    unavailable_items = []
+    total = 0
+    
+    for (item_id, item_user_id, cart_product_id, created_at, product_id, title, price,
+            condition, category, image_url, is_sold, seller_id) in rows:
+        if product_id is None:
+            unavailable_items.append({"id": item_id, "product_id": cart_product_id, "reason": "missing"})
+        elif is_sold:
+            unavailable_items.append({"id": item_id, "product_id": product_id, "reason": "sold"})
+        else:
+            total += price
+            item_parts.append(dumps(_cart_item_row_to_dict(
+                item_id, item_user_id, product_id, created_at, title, price,
+                condition, category, image_url, is_sold, seller_id
+            )))
+    
+    return b''.join((
+        b'{"cartItems":[', b','.join(item_parts),
+        b'],"total":', dumps(total),
+        b',"unavailableItems":', dumps(unavailable_items),
+        b'}'
+    ))
+
 @cart_bp.route('', methods=['GET'])
 @jwt_required()
 def get_cart():
     try:
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
-        
-        if not user:
-            return jsonify({"message": "User not found"}), 404
-        
-        cart_items = CartItem.query.filter_by(user_id=current_user_id).all()
-        
-        # Safely calculate total and check for missing/sold products
-        valid_items = []
-        unavailable_items = []
-        total = 0
-        
-        for item in cart_items:
-            if item.product:
-                if not item.product.is_sold:
-                    total += item.product.price
-                    valid_items.append(item.to_dict())
-                else:
-                    unavailable_items.append({
-                        "id": item.id,
-                        "product_id": item.product_id,
-                        "reason": "sold"
-                    })
-            else:
-                unavailable_items.append({
-                    "id": item.id,
-                    "product_id": item.product_id if hasattr(item, 'product_id') else None,
-                    "reason": "missing"
-                })
-        
-        return jsonify({
-            "cartItems": valid_items,
-            "total": total,
-            "unavailableItems": unavailable_items
-        }), 200
+        current_user_id = int(get_jwt_identity())
+        
+        if request.args.get('summary', 0, type=int):
+            return fast_response(_cart_summary(current_user_id), status=200)
+        
+        cart_version = db.session.query(User.cart_version).filter_by(id=current_user_id).scalar()
+        
+        if cart_version is None:
+            return fast_response({"message": "User not found"}, status=404)
+        
+        # The cart version changes on every write, so it doubles as an ETag
+        etag = f"{current_user_id}-{cart_version}"
+        if request.if_none_match.contains_weak(etag):
+            response = raw_response(b'', status=304)
+        else:
+            response = raw_response(_render_cart(current_user_id, cart_version), status=200)
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'private, max-age=0, must-revalidate'
+        return response
     except Exception as e:
-        current_app.logger.error(f"Error fetching cart: {str(e)}")
-        return jsonify({
+        current_app.logger.error("Error fetching cart: %s", e)
+        return fast_response({
             "message": "Error fetching cart items",
             "details": str(e)
-        }), 500
+        }, status=500)
+
+@cart_bp.route('/total', methods=['GET'])
+@jwt_required()
+def get_cart_total():
+    try:
+        current_user_id = int(get_jwt_identity())
+        return fast_response(_cart_summary(current_user_id), status=200)
+    except Exception as e:
+        current_app.logger.error("Error fetching cart total: %s", e)
+        return fast_response({
+            "message": "Error fetching cart total",
+            "details": str(e)
+        }, status=500)
 
 @cart_bp.route('', methods=['POST'])
 @jwt_required()
 def add_to_cart():
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
-    
-    if not user:
-        return jsonify({"message": "User not found"}), 404
+    current_user_id = int(get_jwt_identity())
     
     try:
-        data = request.get_json()
+        try:
+            product_id = AddToCartIn.model_validate_json(request.get_data()).product_id
+        except ValidationError as e:
+            error = e.errors()[0]
+            if error['type'] in ('json_invalid', 'model_type') or (error['type'] == 'missing' and not error['input']):
+                return fast_response({"message": "No JSON data provided", "details": "Request body is empty"}, status=400)
+            if error['type'] == 'missing':
+                return fast_response({"message": "Product ID is required", "details": "Missing product_id field in request"}, status=400)
+            return fast_response({"message": "Invalid product ID", "details": "Product ID must be a number"}, status=400)
         
-        if not data:
-            return jsonify({"message": "No JSON data provided", "details": "Request body is empty"}), 400
+        # Validate and insert in one statement: the row is only inserted if the
+        # product exists, is unsold, isn't the user's own and isn't in the cart
+        try:
+            cart_item_id = db.session.execute(
+                insert(CartItem).from_select(
+                    ['user_id', 'product_id', 'created_at'],
+                    select(literal(current_user_id), Product.id, literal(datetime.utcnow())).where(
+                        Product.id == product_id,
+                        Product.is_sold.isnot(True),
+                        Product.seller_id != current_user_id,
+                        ~exists().where(
+                            CartItem.user_id == current_user_id,
+                            CartItem.product_id == product_id
+                        )
+                    )
+                ).returning(CartItem.id)
+            ).scalar()
+        except IntegrityError as e:
+            # Only a unique index hit means a concurrent request added the
+            # same product first; anything else (e.g. a foreign key) is a 500
+            if not _is_duplicate_cart_item(e):
+                raise
+            db.session.rollback()
+            cart_item_id = None
         
-        if 'product_id' not in data:
-            return jsonify({"message": "Product ID is required", "details": "Missing product_id field in request"}), 400
+        if cart_item_id is None:
+            # Nothing was inserted, look up why
+            product, existing_item = db.session.query(Product, CartItem).outerjoin(
+                CartItem,
+                and_(CartItem.product_id == Product.id, CartItem.user_id == current_user_id)
+            ).filter(Product.id == product_id).first() or (None, None)
+            
+            if not product:
+                return fast_response({"message": "Product not found", "details": f"No product found with ID {product_id}"}, status=404)
+            
+            if product.is_sold:
+                return fast_response({"message": "Product is no longer available", "details": "This item has already been sold"}, status=400)
+            
+            if existing_item:
+                return fast_response({
+                    "message": "Product is already in your cart", 
+                    "details": "This item is already in your shopping cart",
+                    "cartItem": existing_item.to_dict(include_seller=False)
+                }, status=200)
+            
+            if product.seller_id == current_user_id:
+                return fast_response({"message": "You cannot add your own products to cart", "details": "You are the seller of this item"}, status=400)
+            
+            raise RuntimeError(f"Cart item for product {product_id} was not inserted")
         
-        try:
-            product_id = int(data['product_id'])
-        except (ValueError, TypeError):
-            return jsonify({"message": "Invalid product ID", "details": "Product ID must be a number"}), 400
-        
-        product = Product.query.get(product_id)
-        
-        if not product:
-            return jsonify({"message": "Product not found", "details": f"No product found with ID {product_id}"}), 404
-        
-        if product.is_sold:
-            return jsonify({"message": "Product is no longer available", "details": "This item has already been sold"}), 400
-        
-        # Check if product is already in cart
-        existing_item = CartItem.query.filter_by(user_id=current_user_id, product_id=product_id).first()
-        if existing_item:
-            return jsonify({
-                "message": "Product is already in your cart", 
-                "details": "This item is already in your shopping cart",
-                "cartItem": existing_item.to_dict()
-            }), 400
-        
-        # Prevent adding own products to cart
-        if product.seller_id == current_user_id:
-            return jsonify({"message": "You cannot add your own products to cart", "details": "You are the seller of this item"}), 400
-        
-        # Add to cart
-        cart_item = CartItem(user_id=current_user_id, product_id=product_id)
-        db.session.add(cart_item)
+        User.bump_cart_version(current_user_id)
         db.session.commit()
         
-        return jsonify({
+        cart_item = CartItem.query.options(joinedload(CartItem.product)).get(cart_item_id)
+        
+        return fast_response({
             "message": "Product added to cart successfully",
-            "cartItem": cart_item.to_dict()
-        }), 201
+            "cartItem": cart_item.to_dict(include_seller=False)
+        }, status=201)
         
     except Exception as e:
         db.session.rollback()
-        print(f"Error adding product to cart: {str(e)}")
-        return jsonify({
+        current_app.logger.exception("Error adding product to cart")
+        return fast_response({
             "message": "Error processing your request",
             "details": str(e)
-        }), 500
+        }, status=500)
 
 @cart_bp.route('/<int:id>', methods=['DELETE'])
 @jwt_required()
 def remove_from_cart(id):
-    current_user_id = get_jwt_identity()
+    current_user_id = int(get_jwt_identity())
     
+    # Wait for a running checkout so a removed item can't still be ordered
+    _lock_cart(current_user_id)
     cart_item = CartItem.query.get(id)
     
     if not cart_item:
-        return jsonify({"message": "Cart item not found"}), 404
+        return fast_response({"message": "Cart item not found"}, status=404)
     
     if cart_item.user_id != current_user_id:
-        return jsonify({"message": "You don't have permission to remove this item"}), 403
+        return fast_response({"message": "You don't have permission to remove this item"}, status=403)
     
     db.session.delete(cart_item)
+    User.bump_cart_version(current_user_id)
     db.session.commit()
     
-    return jsonify({
+    return fast_response({
         "message": "Item removed from cart"
-    }), 200
+    }, status=200)
 
 @cart_bp.route('/checkout', methods=['POST'])
 @jwt_required()
 def checkout():
     try:
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
-        
-        if not user:
-            return jsonify({"message": "User not found", "details": "The authenticated user could not be found"}), 404
+        current_user_id = int(get_jwt_identity())
         
-        # Parse input data
+        # Parse input data, an empty body means no shipping address
         try:
-            data = request.get_json() or {}
-        except BadRequest:
-            return jsonify({
-                "message": "Invalid JSON data", 
-                "details": "The provided data is not valid JSON"
-            }), 400
+            shipping_address = CheckoutIn.model_validate_json(request.get_data() or b'{}').shipping_address
+        except ValidationError as e:
+            if e.errors()[0]['type'] in ('json_invalid', 'model_type'):
+                return fast_response({
+                    "message": "Invalid JSON data", 
+                    "details": "The provided data is not valid JSON"
+                }, status=400)
+            return fast_response({
+                "message": "Invalid shipping address",
+                "details": "shipping_address must be a string"
+            }, status=400)
+        
+        _lock_cart(current_user_id)
+        cart_rows = _locked_checkout_rows(current_user_id)
+        
+        # Only materialize the cart items when something can't be bought, to
+        # report which ones
+        if (not cart_rows or len(cart_rows) < cart_rows[0].cart_count
+                or any(row.is_sold for row in cart_rows)):
+            cart_items = _cart_items_with_products(current_user_id)
+            
+            unavailable_products = []
+            for item in cart_items:
+                if not item.product or item.product.is_sold:
+                    unavailable_products.append({
+                        "id": item.product_id if item.product else item.id,
+                        "name": item.product.title if item.product else "Unknown product"
+                    })
             
-        shipping_address = data.get('shipping_address', '')
-        
-        # Get cart items
-        cart_items = CartItem.query.filter_by(user_id=current_user_id).all()
-        
-        if not cart_items:
-            return jsonify({
-                "message": "Your cart is empty",
-                "details": "Add items to your cart before checkout"
-            }), 400
-        
-        # Check if all products are available
-        unavailable_products = []
-        for item in cart_items:
-            if not item.product or item.product.is_sold:
-                unavailable_products.append({
-                    "id": item.product_id if item.product else item.id,
-                    "name": item.product.title if item.product else "Unknown product"
-                })
-        
-        if unavailable_products:
-            return jsonify({
+            # Release the locks only once the items are read, since rolling
+            # back expires them and any later access would reload each row
+            db.session.rollback()
+            
+            if not cart_items:
+                return fast_response({
+                    "message": "Your cart is empty",
+                    "details": "Add items to your cart before checkout"
+                }, status=400)
+            
+            return fast_response({
                 "message": "Some products are no longer available",
                 "details": "The following items are no longer available for purchase",
                 "unavailableProducts": unavailable_products
-            }), 400
+            }, status=400)
+        
+        cart_item_ids = [row.id for row in cart_rows]
+        product_ids = [row.product_id for row in cart_rows]
+        prices = [row.price for row in cart_rows]
         
         # Calculate total
-        total_amount = sum(item.product.price for item in cart_items)
+        total_amount = sum(prices)
         
-        # Create order
+        # Create order and flush to get its id for the order items
         order = Order(
             user_id=current_user_id,
             total_amount=total_amount,
             shipping_address=shipping_address
         )
         db.session.add(order)
+        db.session.flush()
         
-        # Create order items and mark products as sold
-        for cart_item in cart_items:
-            # Create order item
-            order_item = OrderItem(
-                order=order,
-                product_id=cart_item.product_id,
-                price=cart_item.product.price
-            )
-            db.session.add(order_item)
-            
-            # Mark product as sold
-            cart_item.product.is_sold = True
-            
-            # Remove from cart
-            db.session.delete(cart_item)
+        # Create order items in a single executemany INSERT
+        db.session.execute(insert(OrderItem), [
+            {"order_id": order.id, "product_id": product_id, "price": price}
+            for product_id, price in zip(product_ids, prices)
+        ])
+        
+        # Sold products change every cart holding them, not just this one
+        User.bump_cart_versions_for_products(product_ids)
+        
+        # Mark products as sold and clear the cart in one statement each
+        db.session.execute(
+            update(Product).where(Product.id.in_(product_ids)).values(is_sold=True),
+            execution_options={"synchronize_session": False}
+        )
+        db.session.execute(
+            delete(CartItem)
+            .where(CartItem.user_id == current_user_id)
+            .where(CartItem.id.in_(cart_item_ids)),
+            execution_options={"synchronize_session": False}
+        )
         
         db.session.commit()
         
-        return jsonify({
+        return fast_response({
             "message": "Order placed successfully",
             "order": order.to_dict()
-        }), 201
+        }, status=201)
         
     except Exception as e:
         db.session.rollback()
-        current_app.logger.error(f"Checkout error: {str(e)}")
-        return jsonify({
+        current_app.logger.error("Checkout error: %s", e)
+        return fast_response({
             "message": "Error processing your order",
             "details": str(e)
-        }), 500
\ No newline at end of file
+        }, status=500)
\ No newline at end of file
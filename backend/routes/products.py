@@ -123,6 +123,7 @@ def update_product(id):
     if 'image_url' in data:
         product.image_url = data['image_url']
     
+    User.bump_cart_versions_for_products([product.id])
     db.session.commit()
     
     return jsonify({
@@ -146,6 +147,7 @@ def delete_product(id):
         return jsonify({"message": "You don't have permission to delete this product"}), 403
     
     # Delete associated cart items first
+    User.bump_cart_versions_for_products([product.id])
     for cart_item in product.cart_items:
         db.session.delete(cart_item)
     
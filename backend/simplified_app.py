@@ -67,7 +67,7 @@ def expired_token_callback(jwt_header, jwt_data):
 from routes.auth_fix import auth_bp
 from routes.users import users_bp
 from routes.products import products_bp
-from routes.cart_fix import cart_bp
+from routes.cart import cart_bp
 from routes.orders_fix import orders_bp
 
 # Register blueprints
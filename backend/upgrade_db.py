@@ -0,0 +1,83 @@
+"""
+This script upgrades an existing database to the current models, adding the
+columns and indexes introduced after it was first created. db.create_all()
+never alters existing tables, so run this once after pulling model changes.
+Run with: python upgrade_db.py [--drop-duplicate-cart-items]
+"""
+
+import os
+import sys
+from pathlib import Path
+
+from sqlalchemy import inspect, text
+
+# Ensure we're in the right directory
+os.chdir(str(Path(__file__).parent))
+
+def add_cart_version(conn, inspector):
+    columns = {column['name'] for column in inspector.get_columns('users')}
+    if 'cart_version' in columns:
+        print("✅ users.cart_version already exists")
+        return True
+    conn.execute(text("ALTER TABLE users ADD COLUMN cart_version INTEGER NOT NULL DEFAULT 0"))
+    print("✅ Added users.cart_version")
+    return True
+
+def add_cart_item_index(conn, inspector, drop_duplicates):
+    indexes = {index['name'] for index in inspector.get_indexes('cart_items')}
+    if 'ix_cartitem_user_product' in indexes:
+        print("✅ ix_cartitem_user_product already exists")
+        return True
+
+    duplicates = conn.execute(text(
+        "SELECT user_id, product_id, COUNT(*) FROM cart_items "
+        "GROUP BY user_id, product_id HAVING COUNT(*) > 1"
+    )).fetchall()
+    if duplicates:
+        print(f"Found {len(duplicates)} duplicated (user_id, product_id) pairs in cart_items:")
+        for user_id, product_id, count in duplicates:
+            print(f"  user {user_id}, product {product_id}: {count} rows")
+        if not drop_duplicates:
+            print("❌ Not creating ix_cartitem_user_product. Re-run with "
+                  "--drop-duplicate-cart-items to keep only the oldest row of each pair.")
+            return False
+        deleted = conn.execute(text(
+            "DELETE FROM cart_items WHERE id NOT IN "
+            "(SELECT MIN(id) FROM cart_items GROUP BY user_id, product_id)"
+        )).rowcount
+        print(f"✅ Deleted {deleted} duplicate cart rows")
+
+    conn.execute(text(
+        "CREATE UNIQUE INDEX ix_cartitem_user_product ON cart_items (user_id, product_id)"
+    ))
+    print("✅ Created index ix_cartitem_user_product")
+    return True
+
+def upgrade_schema(drop_duplicates=False):
+    from extensions import db
+
+    inspector = inspect(db.engine)
+    tables = inspector.get_table_names()
+    ok = True
+
+    # Missing tables are left for db.create_all() to build with the full schema
+    with db.engine.begin() as conn:
+        if 'users' in tables:
+            ok = add_cart_version(conn, inspector) and ok
+        if 'cart_items' in tables:
+            ok = add_cart_item_index(conn, inspector, drop_duplicates) and ok
+    return ok
+
+if __name__ == '__main__':
+    print("="*50)
+    print("DATABASE UPGRADE SCRIPT")
+    print("="*50)
+
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        print(f"\nUpgrading {app.config['SQLALCHEMY_DATABASE_URI']}...")
+        if not upgrade_schema(drop_duplicates='--drop-duplicate-cart-items' in sys.argv):
+            sys.exit(1)
+    print("\n✅ Database upgrade complete!")
@@ -0,0 +1 @@
+# This file initializes the utils package
\ No newline at end of file
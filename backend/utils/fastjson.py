@@ -0,0 +1,26 @@
+from decimal import Decimal
+from uuid import UUID
+
+import orjson
+from flask import Response
+from sqlalchemy.engine import Row
+
+def _default(obj):
+    # orjson already handles datetime, dict, list and dataclasses natively
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, UUID):
+        return str(obj)
+    if isinstance(obj, Row):
+        return obj._asdict()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+def dumps(obj):
+    return orjson.dumps(obj, default=_default)
+
+def fast_response(obj, status=200):
+    return raw_response(dumps(obj), status=status)
+
+def raw_response(body, status=200):
+    # For bodies that are already serialized, e.g. cached responses
+    return Response(body, status=status, mimetype="application/json")